@@ -0,0 +1,164 @@
+import argparse
+import os
+import random
+import time
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+from chatbot_function import DataProcessor, Chatbot
+from semantic_index import SemanticIndex, DEFAULT_INDEX_DIR, DEFAULT_MODEL
+
+
+# Phrase swaps used to paraphrase corpus questions into patient-style queries
+PARAPHRASES = [
+    ("what is (are) ", "can you explain "),
+    ("what is ", "tell me about "),
+    ("what are the symptoms of ", "what signs show "),
+    ("what are the treatments for ", "how do you treat "),
+    ("how to diagnose ", "how do doctors test for "),
+    ("what causes ", "why do people get "),
+    ("who is at risk for ", "who can get "),
+    ("how to prevent ", "how can i avoid "),
+    ("is ", "can "),
+]
+
+
+def make_typo(word, rng):
+    if len(word) < 5:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    return word[:i] + word[i + 1:]
+
+
+def make_labelled_queries(questions, num_queries, seed=42):
+    """
+    Perturb corpus questions into queries whose correct answer is known:
+    a phrase-level paraphrase plus a dropped character in the longest word.
+    Returns a list of (query, target position in df).
+    """
+    rng = random.Random(seed)
+    positions = rng.sample(range(len(questions)), min(num_queries, len(questions)))
+    queries = []
+    for position in positions:
+        query = questions[position]
+        for phrase, replacement in PARAPHRASES:
+            if query.startswith(phrase):
+                query = replacement + query[len(phrase):]
+                break
+        words = query.split()
+        longest = max(range(len(words)), key=lambda i: len(words[i]))
+        words[longest] = make_typo(words[longest], rng)
+        queries.append((" ".join(words), position))
+    return queries
+
+
+def percentiles(timings_ms):
+    return np.percentile(timings_ms, 50), np.percentile(timings_ms, 95)
+
+
+def load_index(questions, index_dir, dtype=None, model_name=DEFAULT_MODEL, embedder=None,
+               nprobe=16, rebuild=False):
+    if rebuild or not os.path.exists(os.path.join(index_dir, "meta.json")):
+        index = SemanticIndex.build(questions, index_dir=index_dir, model_name=model_name,
+                                    dtype=dtype or "float16", embedder=embedder)
+        index.nprobe = nprobe
+        return index
+    index = SemanticIndex.load(index_dir, embedder=embedder, questions=questions, nprobe=nprobe)
+    if dtype and dtype != index.dtype:
+        raise ValueError(f"Existing index in {index_dir} is {index.dtype}, not {dtype}; pass --rebuild.")
+    return index
+
+
+def benchmark(index_dir=DEFAULT_INDEX_DIR, dtype=None, k=5, nprobe=16, num_queries=200,
+              similarity_threshold=0.5, dense_similarity_threshold=0.75, file_path=None,
+              model_name=DEFAULT_MODEL, embedder=None, rebuild=False,
+              thresholds=(0.5, 0.6, 0.7, 0.75, 0.8, 0.85, 0.9)):
+    data_processor = DataProcessor(file_path)
+    questions = data_processor.df['question'].tolist()
+    index = load_index(questions, index_dir, dtype, model_name, embedder, nprobe, rebuild)
+
+    queries = make_labelled_queries(questions, num_queries)
+    # Held-out questions have no row in df: the right answer is UNKNOWN
+    unanswerable = data_processor.test_df['question'].head(num_queries).tolist()
+    print(f"⏱️ Benchmarking {len(queries)} labelled and {len(unanswerable)} unanswerable queries "
+          f"over {len(questions)} questions (k={k}, nprobe={index.nprobe})...")
+
+    tfidf_ms, embed_ms, exact_ms, ann_ms = [], [], [], []
+    recalls = []
+    for query, _ in queries:
+        start = time.perf_counter()
+        user_tfidf = data_processor.vectorizer.transform([query])
+        cosine_similarity(user_tfidf, data_processor.tfidf_matrix)
+        tfidf_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        query_vec = index.embed_query(query)
+        embed_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        exact_ids, _ = index.exact_search_vector(query_vec, k=k)
+        exact_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        ann_ids, _ = index.search_vector(query_vec, k=k)
+        ann_ms.append((time.perf_counter() - start) * 1000)
+
+        recalls.append(len(set(exact_ids) & set(ann_ids)) / max(len(exact_ids), 1))
+
+    results, sweeps = {}, {}
+    for mode in Chatbot.RETRIEVAL_MODES:
+        chatbot = Chatbot(data_processor, similarity_threshold=similarity_threshold,
+                          dense_similarity_threshold=dense_similarity_threshold,
+                          retrieval_mode=mode, semantic_index=index, cache_size=0)
+        correct, timings = 0, []
+        for query, position in queries:
+            start = time.perf_counter()
+            matched_question, _, _ = chatbot.get_response(query)
+            timings.append((time.perf_counter() - start) * 1000)
+            correct += matched_question == questions[position]
+        unknown = sum(chatbot.get_response(query)[0] == "UNKNOWN" for query in unanswerable)
+        results[mode] = (correct / len(queries), unknown / max(len(unanswerable), 1),
+                         *percentiles(timings))
+
+        # Scores before the threshold, to see where a cut-off trades answers for false matches
+        labelled = [(chatbot.best_match(query), position) for query, position in queries]
+        held_out = [chatbot.best_match(query)[1] for query in unanswerable]
+        sweeps[mode] = [(
+            threshold,
+            np.mean([pos == target and score >= threshold for (pos, score), target in labelled]),
+            np.mean([score < threshold for score in held_out]) if held_out else 0.0,
+        ) for threshold in thresholds]
+
+    print("\n📊 Results")
+    print(f"ANN recall@{k} vs exact dense scan: {np.mean(recalls):.3f}")
+    for name, timings in (("TF-IDF exact scan", tfidf_ms), ("Query embedding", embed_ms),
+                          ("Dense exact scan", exact_ms), ("Dense IVF search", ann_ms)):
+        p50, p95 = percentiles(timings)
+        print(f"{name:<20} p50={p50:.2f}ms p95={p95:.2f}ms")
+    print(f"Thresholds: tfidf={similarity_threshold}, dense/hybrid={dense_similarity_threshold}")
+    for mode, (accuracy, unknown_rate, p50, p95) in results.items():
+        print(f"get_response[{mode:<6}] top-1 accuracy={accuracy:.1%} "
+              f"unanswerable->UNKNOWN={unknown_rate:.1%} p50={p50:.2f}ms p95={p95:.2f}ms")
+    print("\n📈 Threshold sweep (top-1 accuracy / unanswerable->UNKNOWN)")
+    for mode, sweep in sweeps.items():
+        print(f"{mode:<6} " + "  ".join(f"{t:.2f}: {acc:.1%}/{unk:.1%}" for t, acc, unk in sweep))
+    return results, sweeps
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dense ANN retrieval against the TF-IDF exact scan")
+    parser.add_argument("--file-path", default=None)
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--index-dir", default=DEFAULT_INDEX_DIR)
+    parser.add_argument("--dtype", choices=["float16", "int8"], default=None,
+                        help="Embedding storage for a new index (default float16)")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the index even if one exists")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--similarity-threshold", type=float, default=0.5)
+    parser.add_argument("--dense-threshold", type=float, default=0.75)
+    args = parser.parse_args()
+    benchmark(args.index_dir, args.dtype, args.k, args.nprobe, args.num_queries,
+              similarity_threshold=args.similarity_threshold,
+              dense_similarity_threshold=args.dense_threshold,
+              file_path=args.file_path, model_name=args.model, rebuild=args.rebuild)
@@ -1,63 +1,410 @@
 import os
+import re
+import threading
+from collections import Counter, OrderedDict
+import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.model_selection import train_test_split
 
 
+class SpellCorrector:
+    """
+    SymSpell-style corrector built from the corpus vocabulary.
+
+    Every vocabulary term is indexed under all of its deletes up to
+    `max_edit_distance` (over the first `prefix_length` characters), so
+    looking up a misspelt word only needs the deletes of the query word
+    instead of a scan over the whole vocabulary. Words of up to
+    `short_word_length` letters may only be one edit away from their
+    correction, so short names are not rewritten into other conditions.
+    """
+
+    def __init__(self, term_counts, max_edit_distance=2, prefix_length=7, min_length=4,
+                 short_word_length=5):
+        self.max_edit_distance = max_edit_distance
+        self.short_word_length = short_word_length
+        self.prefix_length = prefix_length
+        self.min_length = min_length
+        self.terms = list(term_counts)
+        self.counts = [term_counts[term] for term in self.terms]
+        self.term_ids = {term: i for i, term in enumerate(self.terms)}
+        self.deletes = {}
+        for term_id, term in enumerate(self.terms):
+            for variant in self._deletes(term[:prefix_length]):
+                self.deletes.setdefault(variant, []).append(term_id)
+
+    @classmethod
+    def from_corpus(cls, questions, vectorizer, **kwargs):
+        analyzer = vectorizer.build_analyzer()
+        term_counts = Counter()
+        for question in questions:
+            term_counts.update(analyzer(question))
+        return cls(term_counts, **kwargs)
+
+    def _deletes(self, word, max_distance=None):
+        variants = {word}
+        frontier = {word}
+        for _ in range(self.max_edit_distance if max_distance is None else max_distance):
+            frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+            variants |= frontier
+        return variants
+
+    @staticmethod
+    def _distance(a, b, max_distance):
+        """Optimal string alignment distance, or max_distance + 1 once exceeded."""
+        if abs(len(a) - len(b)) > max_distance:
+            return max_distance + 1
+        prev_prev, prev = None, list(range(len(b) + 1))
+        for i in range(1, len(a) + 1):
+            current = [i] + [0] * len(b)
+            for j in range(1, len(b) + 1):
+                cost = 0 if a[i - 1] == b[j - 1] else 1
+                current[j] = min(prev[j] + 1, current[j - 1] + 1, prev[j - 1] + cost)
+                if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                    current[j] = min(current[j], prev_prev[j - 2] + 1)
+            if min(current) > max_distance:
+                return max_distance + 1
+            prev_prev, prev = prev, current
+        return prev[-1]
+
+    def correct_word(self, word):
+        if word in self.term_ids or len(word) < self.min_length or not word.isalpha():
+            return word
+        max_distance = self.max_edit_distance
+        if len(word) <= self.short_word_length:
+            max_distance = min(max_distance, 1)
+        best, best_key = word, None
+        seen = set()
+        for variant in self._deletes(word[:self.prefix_length], max_distance):
+            for term_id in self.deletes.get(variant, ()):
+                if term_id in seen:
+                    continue
+                seen.add(term_id)
+                distance = self._distance(word, self.terms[term_id], max_distance)
+                if distance > max_distance:
+                    continue
+                key = (distance, -self.counts[term_id])
+                if best_key is None or key < best_key:
+                    best, best_key = self.terms[term_id], key
+        return best
+
+    def correct(self, text):
+        return re.sub(r"\b\w\w+\b", lambda m: self.correct_word(m.group(0)), text)
+
+
+def join_sources(values):
+    """Merge already-joined source strings for the incremental path, keeping each source once."""
+    sources = [part.strip() for value in values for part in str(value).split(", ")]
+    return ", ".join(pd.unique(pd.Series(sources)))
+
+
+def merge_duplicates(df):
+    """Apply the `clean_data` rules: drop 'key points' answers, normalise and merge duplicate questions."""
+    # Remove rows with 'key points' in the answer
+    df = df[~df['answer'].str.contains(r'key points', case=False, na=False)].copy()
+
+    # Preprocess question and answer columns
+    df['question'] = df['question'].str.lower().str.strip()
+    df['answer'] = df['answer'].str.lower().str.strip()
+
+    # Group by question to merge duplicate entries
+    return df.groupby("question", as_index=False).agg({
+        "answer": lambda x: " || ".join(x.astype(str)),
+        "source": lambda x: ", ".join(x.astype(str).unique())
+    })
+
+
+class CorpusIndex:
+    """
+    Immutable snapshot of everything a query reads. Updates build a new
+    snapshot and swap it in with a single assignment, so in-flight requests
+    keep using the snapshot they started with.
+    """
+
+    def __init__(self, df, vectorizer, tfidf_matrix, spell_corrector, pending=0):
+        self.df = df
+        self.vectorizer = vectorizer
+        self.tfidf_matrix = tfidf_matrix
+        self.spell_corrector = spell_corrector
+        # Rows vectorized against the old vocabulary since the last full fit
+        self.pending = pending
+        self.positions = {question: i for i, question in enumerate(df['question'])}
+
+    @classmethod
+    def fit(cls, df):
+        vectorizer = TfidfVectorizer()
+        tfidf_matrix = vectorizer.fit_transform(df['question'])
+        spell_corrector = SpellCorrector.from_corpus(df['question'], vectorizer)
+        return cls(df, vectorizer, tfidf_matrix, spell_corrector)
+
+
 class DataProcessor:
-    def __init__(self, file_path=None):
+    UPDATE_MODES = ("append", "replace")
+    CURATED_COLUMNS = ["batch", "mode", "question", "answer", "source"]
+
+    def __init__(self, file_path=None, refit_threshold=200, curated_path=None):
         if not file_path:
             # Resolve path relative to this file
             file_path = os.path.join(os.path.dirname(__file__), "cleaned_medquad.csv")
         print(f"📂 Loading data from: {file_path}")
 
+        self.file_path = file_path
+        # Persisted updates live apart from the main CSV so they never shift the train/test split
+        self.curated_path = curated_path or os.path.join(os.path.dirname(file_path), "curated_qa.csv")
+        self._next_batch = 0
+        # Number of incrementally added questions that triggers a background re-fit
+        self.refit_threshold = refit_threshold
+        self._update_lock = threading.Lock()
+        self._refit_thread = None
+
         self.df = pd.read_csv(file_path)
         self.clean_data()
-        self.vectorizer = TfidfVectorizer()
-        self.tfidf_matrix = self.vectorizer.fit_transform(self.df['question'])
+        self._swap(CorpusIndex.fit(self.df))
+        self.load_curated()
+
+    def _swap(self, index):
+        # Rebinding one attribute is atomic; the mirrors below are for offline/CLI use
+        self.index = index
+        self.df = index.df
+        self.vectorizer = index.vectorizer
+        self.tfidf_matrix = index.tfidf_matrix
+        self.spell_corrector = index.spell_corrector
 
     def clean_data(self):
         print("🧹 Cleaning data...")
         print("🔍 Missing values:\n", self.df.isnull().sum())
 
-        # Remove rows with 'key points' in the answer
-        self.df = self.df[~self.df['answer'].str.contains(r'key points', case=False, na=False)]
-
-        # Preprocess question and answer columns
-        self.df['question'] = self.df['question'].str.lower().str.strip()
-        self.df['answer'] = self.df['answer'].str.lower().str.strip()
-
-        # Group by question to merge duplicate entries
-        self.df = self.df.groupby("question", as_index=False).agg({
-            "answer": lambda x: " || ".join(x.astype(str)),
-            "source": lambda x: ", ".join(x.astype(str).unique())
-        })
+        self.df = merge_duplicates(self.df)
 
         # Split into train/test for potential future use
         self.df, self.test_df = train_test_split(self.df, test_size=0.2, random_state=42)
         print("✅ Data cleaned and split.")
 
+    def load_curated(self):
+        """Replay persisted updates, batch by batch, on top of the freshly split corpus."""
+        if not os.path.exists(self.curated_path):
+            return
+        curated = pd.read_csv(self.curated_path)
+        print(f"📂 Replaying curated entries from: {self.curated_path}")
+        for batch, group in curated.groupby("batch", sort=False):
+            self._apply_entries(group[["question", "answer", "source"]], group["mode"].iloc[0])
+            self._next_batch = max(self._next_batch, int(batch) + 1)
+        if self.index.pending:
+            self.refit()
+
+    def upsert_entries(self, entries, mode="append", persist=False):
+        """
+        Add QA entries to the live index without a full re-fit.
+
+        New questions are vectorized against the existing vocabulary and
+        appended. For questions already in the corpus, "append" merges the
+        answer and source like `clean_data` does; "replace" overwrites them.
+        With `persist=True` the batch is also written to `curated_path` and
+        replayed with the same mode on the next start.
+        """
+        if mode not in self.UPDATE_MODES:
+            raise ValueError(f"Unknown update mode: {mode}")
+        entries = pd.DataFrame(list(entries), columns=["question", "answer", "source"])
+        entries['source'] = entries['source'].fillna("Curated")
+
+        with self._update_lock:
+            added, updated = self._apply_entries(entries, mode)
+            if persist:
+                curated = entries.assign(batch=self._next_batch, mode=mode)[self.CURATED_COLUMNS]
+                curated.to_csv(self.curated_path, mode="a", index=False,
+                               header=not os.path.exists(self.curated_path))
+                self._next_batch += 1
+            pending = self.index.pending
+
+        print(f"➕ Corpus updated: {added} added, {updated} updated.")
+        if self.refit_threshold and pending >= self.refit_threshold:
+            self.refit(background=True)
+        return {"added": added, "updated": updated, "pending_refit": pending}
+
+    def _apply_entries(self, entries, mode):
+        # Callers hold _update_lock (or run before the processor is shared)
+        entries = merge_duplicates(entries)
+        index = self.index
+        df = index.df.copy()
+        added, updated = [], 0
+        for row in entries.itertuples(index=False):
+            position = index.positions.get(row.question)
+            if position is None:
+                added.append(row)
+                continue
+            if mode == "append":
+                answer = df.iloc[position]['answer'] + " || " + row.answer
+                source = join_sources([df.iloc[position]['source'], row.source])
+            else:
+                answer, source = row.answer, row.source
+            df.iloc[position, df.columns.get_loc('answer')] = answer
+            df.iloc[position, df.columns.get_loc('source')] = source
+            updated += 1
+
+        tfidf_matrix = index.tfidf_matrix
+        if added:
+            added = pd.DataFrame(added, columns=df.columns)
+            start = int(df.index.max()) + 1 if len(df) else 0
+            added.index = range(start, start + len(added))
+            tfidf_matrix = sp.vstack(
+                [tfidf_matrix, index.vectorizer.transform(added['question'])], format="csr"
+            )
+            df = pd.concat([df, added])
+
+        self._swap(CorpusIndex(df, index.vectorizer, tfidf_matrix, index.spell_corrector,
+                               pending=index.pending + len(added)))
+        return len(added), updated
+
+    def refit(self, background=False):
+        """Re-fit the vectorizer and spell corrector on the full corpus and swap them in."""
+        if background:
+            if self._refit_thread is None or not self._refit_thread.is_alive():
+                self._refit_thread = threading.Thread(target=self.refit, daemon=True)
+                self._refit_thread.start()
+            return
+        with self._update_lock:
+            print("🔄 Re-fitting TF-IDF index...")
+            self._swap(CorpusIndex.fit(self.index.df))
+            print("✅ TF-IDF index re-fitted.")
+
 
 class Chatbot:
-    def __init__(self, data_processor, similarity_threshold=0.5):
+    RETRIEVAL_MODES = ("tfidf", "dense", "hybrid")
+
+    def __init__(self, data_processor, similarity_threshold=0.5, retrieval_mode="tfidf",
+                 semantic_index=None, hybrid_weight=0.5, dense_top_k=10,
+                 spell_correction=True, cache_size=1024, dense_similarity_threshold=0.75):
+        if retrieval_mode not in self.RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {retrieval_mode}")
+        if retrieval_mode != "tfidf" and semantic_index is None:
+            raise ValueError(f"Retrieval mode '{retrieval_mode}' requires a semantic_index")
         self.data_processor = data_processor
         self.similarity_threshold = similarity_threshold
+        # Sentence-embedding cosines run higher than TF-IDF ones, even for unrelated questions,
+        # so dense and hybrid matches need their own cut-off
+        self.dense_similarity_threshold = dense_similarity_threshold
+        self.retrieval_mode = retrieval_mode
+        self.semantic_index = semantic_index
+        # Weight of the dense score in hybrid mode; TF-IDF gets the remainder.
+        self.hybrid_weight = hybrid_weight
+        self.dense_top_k = dense_top_k
+        self.spell_correction = spell_correction
+        # LRU cache of normalized query -> response for frequently repeated questions
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_state = None
+        self._cache_lock = threading.Lock()
+
+    @staticmethod
+    def normalize_query(user_query):
+        return " ".join(user_query.lower().split())
+
+    def _tfidf_scores(self, index, queries):
+        user_tfidf = index.vectorizer.transform(queries)
+        if user_tfidf.nnz == 0:
+            # No known terms: every similarity would be zero, skip the scan
+            return None
+        return cosine_similarity(user_tfidf, index.tfidf_matrix)
+
+    def _lexical_scores(self, index, queries):
+        """
+        TF-IDF scores of the typed query or, if it matches strictly better,
+        of its spell-corrected form; both are scored in one pass.
+        """
+        similarities = self._tfidf_scores(index, queries)
+        if similarities is None:
+            return None
+        # argmax picks the first row on ties, so the typed query wins unless beaten
+        return similarities[similarities.max(axis=1).argmax()]
+
+    def _best_match(self, index, queries):
+        if self.retrieval_mode == "tfidf":
+            similarities = self._lexical_scores(index, queries)
+            if similarities is None:
+                return 0, 0.0
+            best_match_index = similarities.argmax()
+            return best_match_index, similarities[best_match_index]
+
+        # The sentence model's subword tokenizer tolerates typos, so only the typed query is embedded
+        ids, dense_scores = self.semantic_index.search(queries[0], k=self.dense_top_k)
+        # The semantic index may already cover rows added after this snapshot was taken
+        in_snapshot = ids < len(index.df)
+        ids, dense_scores = ids[in_snapshot], dense_scores[in_snapshot]
+        if self.retrieval_mode == "dense":
+            if len(ids) == 0:
+                return 0, 0.0
+            return ids[0], dense_scores[0]
+
+        # Hybrid: fuse dense scores of the ANN candidates into the TF-IDF scan
+        similarities = self._lexical_scores(index, queries)
+        if similarities is None:
+            similarities = np.zeros(len(index.df))
+        fused = (1 - self.hybrid_weight) * similarities
+        fused[ids] += self.hybrid_weight * dense_scores
+        best_match_index = fused.argmax()
+        return best_match_index, fused[best_match_index]
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
 
     def get_response(self, user_query):
-        user_query = user_query.lower().strip()
-        user_tfidf = self.data_processor.vectorizer.transform([user_query])
-        similarities = cosine_similarity(user_tfidf, self.data_processor.tfidf_matrix)
+        user_query = self.normalize_query(user_query)
+        # Take one snapshot so a concurrent corpus update cannot mix old and new state
+        index = self.data_processor.index
+        # Rows embedded by SemanticIndex.sync() after a swap must also invalidate the cache
+        state = (index, self.semantic_index.covered if self.semantic_index is not None else None)
+        with self._cache_lock:
+            if self._cache_state != state:
+                # Corpus changed since these answers were cached
+                self._cache.clear()
+                self._cache_state = state
+            if user_query in self._cache:
+                self._cache.move_to_end(user_query)
+                return self._cache[user_query]
+
+        response = self._answer(index, user_query)
+
+        if self.cache_size:
+            with self._cache_lock:
+                if self._cache_state != state:
+                    return response
+                self._cache[user_query] = response
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return response
+
+    @property
+    def threshold(self):
+        if self.retrieval_mode == "tfidf":
+            return self.similarity_threshold
+        return self.dense_similarity_threshold
+
+    def best_match(self, user_query, index=None):
+        """(df position, score) of the closest question, before the threshold is applied."""
+        index = index or self.data_processor.index
+        user_query = self.normalize_query(user_query)
+        queries = [user_query]
+        # Only the TF-IDF scoring uses the corrected query (dense mode embeds the typed one)
+        if self.spell_correction and self.retrieval_mode != "dense":
+            corrected_query = index.spell_corrector.correct(user_query)
+            if corrected_query != user_query:
+                queries.append(corrected_query)
+        return self._best_match(index, queries)
 
-        best_match_index = similarities.argmax()
-        best_score = similarities[0, best_match_index]
+    def _answer(self, index, user_query):
+        best_match_index, best_score = self.best_match(user_query, index)
 
-        if best_score < self.similarity_threshold:
+        if best_score < self.threshold:
             return "UNKNOWN", "I'm sorry, I don't have enough information to answer that question.", "N/A"
 
-        best_question = self.data_processor.df.iloc[best_match_index]['question']
-        best_answer = self.data_processor.df.iloc[best_match_index]['answer'].replace(" || ", "\n- ")
-        source = self.data_processor.df.iloc[best_match_index]['source']
+        best_row = index.df.iloc[best_match_index]
+        best_question = best_row['question']
+        best_answer = best_row['answer'].replace(" || ", "\n- ")
+        source = best_row['source']
 
         return best_question, best_answer, source
 
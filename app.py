@@ -1,11 +1,14 @@
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, Header, HTTPException
 from pydantic import BaseModel
-from typing import List
+from typing import List, Literal
 from OCR.ocr_processor import OCRProcessor  # Correct import of OCRProcessor class
 from summarizer.Summarizer import Summarizer
 from KeywordExtraction.MedicalKeywordExtractor import MedicalKeywordExtractor
 from summarizer.translator_module import TextTranslator
 from Chatbot.chatbot_function import DataProcessor, Chatbot
+from Chatbot.semantic_index import SemanticIndex, DEFAULT_INDEX_DIR
+import os
+import hmac
 
 app = FastAPI(
     title="CareCompanion API",
@@ -23,7 +26,24 @@ try:
     
     # Initialize components
     data_processor = DataProcessor()
-    chatbot = Chatbot(data_processor)
+
+    # "tfidf" (default), "dense" or "hybrid"; dense modes need a prebuilt semantic index
+    retrieval_mode = os.getenv("CHATBOT_RETRIEVAL_MODE", "tfidf")
+    semantic_index = None
+    if retrieval_mode != "tfidf":
+        semantic_index = SemanticIndex.load(
+            os.getenv("CHATBOT_INDEX_DIR", DEFAULT_INDEX_DIR),
+            questions=data_processor.df['question'].tolist()
+        )
+        # Cover curated entries replayed on top of the indexed corpus
+        semantic_index.sync(data_processor.df['question'].tolist())
+    chatbot = Chatbot(
+        data_processor,
+        retrieval_mode=retrieval_mode,
+        semantic_index=semantic_index,
+        # Cut-off for dense/hybrid scores; tune with Chatbot/benchmark_retrieval.py
+        dense_similarity_threshold=float(os.getenv("CHATBOT_DENSE_THRESHOLD", "0.75"))
+    )
     summarizer = Summarizer()
     
     logging.info("✅ All components loaded successfully")
@@ -51,6 +71,23 @@ class TranslateRequest(BaseModel):
     text: str
     source_lang: str
 
+class QAEntry(BaseModel):
+    question: str
+    answer: str
+    source: str = "Curated"
+
+class CorpusUpdateRequest(BaseModel):
+    entries: List[QAEntry]
+    mode: Literal["append", "replace"] = "append"
+    persist: bool = False
+
+def check_admin_token(token):
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN not set)")
+    if token is None or not hmac.compare_digest(token.encode(), admin_token.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
 # Routes
 @app.get("/")
 async def root():
@@ -117,3 +154,27 @@ async def translate(req: TranslateRequest):
     except Exception as e:
         logging.error(f"❌ Error in /translate route: {str(e)}")
         return {"error": f"Something went wrong: {str(e)}"}
+
+# Admin routes are sync so FastAPI runs them in its threadpool and /chat is never blocked
+@app.post("/admin/qa")
+def update_corpus(req: CorpusUpdateRequest, x_admin_token: str = Header(None)):
+    check_admin_token(x_admin_token)
+    try:
+        result = data_processor.upsert_entries(
+            [(e.question, e.answer, e.source) for e in req.entries],
+            mode=req.mode,
+            persist=req.persist
+        )
+        if semantic_index is not None:
+            # Embed new questions so dense/hybrid retrieval can return them
+            semantic_index.sync(data_processor.index.df['question'].tolist())
+        return result
+    except Exception as e:
+        logging.error(f"❌ Error in /admin/qa route: {str(e)}")
+        return {"error": f"Something went wrong: {str(e)}"}
+
+@app.post("/admin/refit")
+def refit_corpus(x_admin_token: str = Header(None)):
+    check_admin_token(x_admin_token)
+    data_processor.refit(background=True)
+    return {"status": "Re-fit started"}
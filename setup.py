@@ -17,6 +17,7 @@ setup(
         "sentencepiece>=0.1.97",
         "spacy>=3.5.0",
         "scikit-learn>=1.2.2",
+        "scipy>=1.8.0",
         "pandas>=2.0.1",
         "googletrans==4.0.0-rc1",
         "regex>=2023.5.5",
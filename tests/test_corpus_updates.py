@@ -0,0 +1,148 @@
+import zlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from Chatbot.chatbot_function import Chatbot, DataProcessor, merge_duplicates
+from Chatbot.semantic_index import SemanticIndex
+
+
+class HashingEmbedder:
+    """Bag-of-words hashing embedder standing in for the sentence model."""
+
+    def encode(self, texts):
+        vectors = np.zeros((len(texts), 64), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.split():
+                vectors[i, zlib.crc32(word.encode()) % 64] += 1
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    rows = [(f"What causes condition{i}?", f"Answer {i}.", "NIH") for i in range(50)]
+    path = tmp_path / "medquad.csv"
+    pd.DataFrame(rows, columns=["question", "answer", "source"]).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def processor(csv_path):
+    return DataProcessor(csv_path, refit_threshold=0)
+
+
+def row(processor, question):
+    df = processor.index.df
+    return df[df['question'] == question].iloc[0]
+
+
+def test_merge_duplicates_keeps_clean_data_rules():
+    df = pd.DataFrame({
+        "question": ["What is X? ", "what is x?", "what is x?", "what is y?"],
+        "answer": ["First.", "Second.", "Key Points: skip", "Y."],
+        "source": ["A, B", "B", "C", "D"],
+    })
+
+    merged = merge_duplicates(df).set_index("question")
+
+    assert merged.loc["what is x?", "answer"] == "first. || second."
+    assert merged.loc["what is x?", "source"] == "A, B, B"
+
+
+def test_append_merges_existing_question(processor):
+    question = processor.df['question'].iloc[0]
+    before = row(processor, question)
+
+    result = processor.upsert_entries([(question.upper(), "More info.", "CDC"),
+                                       (question, "Even more.", before['source'])])
+
+    after = row(processor, question)
+    assert result == {"added": 0, "updated": 1, "pending_refit": 0}
+    assert after['answer'] == before['answer'] + " || more info. || even more."
+    assert after['source'] == "NIH, CDC"
+    assert len(processor.df) == 40
+
+
+def test_replace_overwrites_existing_question(processor):
+    question = processor.df['question'].iloc[0]
+
+    processor.upsert_entries([(question, "Replaced.", "Curated")], mode="replace")
+
+    assert row(processor, question)['answer'] == "replaced."
+    assert row(processor, question)['source'] == "Curated"
+
+
+def test_new_question_is_searchable_before_refit(processor):
+    result = processor.upsert_entries([("What causes condition99?", "New.", None)])
+
+    chatbot = Chatbot(processor)
+    assert result["added"] == 1
+    assert processor.tfidf_matrix.shape[0] == len(processor.df) == 41
+    assert chatbot.get_response("what causes condition99?") == ("what causes condition99?", "new.", "Curated")
+
+
+def test_key_points_entries_are_dropped(processor):
+    result = processor.upsert_entries([("What is new?", "Key points: ignore me", "NIH")])
+
+    assert result["added"] == 0
+
+
+def test_unknown_mode_is_rejected(processor):
+    with pytest.raises(ValueError):
+        processor.upsert_entries([("q", "a", "s")], mode="merge")
+
+
+def test_refit_adds_new_terms_to_vocabulary(processor):
+    processor.upsert_entries([("What is gout?", "Joint pain.", "NIH")])
+    assert "gout" not in processor.vectorizer.vocabulary_
+
+    processor.refit()
+
+    assert "gout" in processor.vectorizer.vocabulary_
+    assert processor.index.pending == 0
+
+
+def test_persisted_updates_survive_restart(csv_path):
+    processor = DataProcessor(csv_path, refit_threshold=0)
+    base_questions = processor.df['question'].tolist()
+    test_questions = processor.test_df['question'].tolist()
+    existing = base_questions[0]
+
+    processor.upsert_entries([(existing, "Appended.", "CDC"),
+                              ("What is new?", "New.", "Curated")], persist=True)
+    processor.upsert_entries([("What is new?", "Replaced.", "Curated")], mode="replace", persist=True)
+    processor.upsert_entries([(base_questions[1], "Not persisted.", "CDC")])
+
+    restarted = DataProcessor(csv_path, refit_threshold=0)
+
+    # The main CSV and its split are untouched; curated rows follow the split corpus
+    assert restarted.test_df['question'].tolist() == test_questions
+    assert restarted.df['question'].tolist() == base_questions + ["what is new?"]
+    assert row(restarted, "what is new?")['answer'] == "replaced."
+    assert row(restarted, existing)['answer'] == row(processor, existing)['answer']
+    assert row(restarted, base_questions[1])['answer'] != row(processor, base_questions[1])['answer']
+
+
+def test_chatbot_cache_is_cleared_when_index_changes(processor):
+    chatbot = Chatbot(processor)
+    question = processor.df['question'].iloc[0]
+    assert chatbot.get_response(question)[1] == row(processor, question)['answer']
+
+    processor.upsert_entries([(question, "Updated answer.", "NIH")], mode="replace")
+
+    assert chatbot.get_response(question)[1] == "updated answer."
+
+
+def test_chatbot_cache_is_cleared_when_semantic_index_syncs(tmp_path, processor):
+    semantic_index = SemanticIndex.build(processor.df['question'], index_dir=tmp_path / "index",
+                                         embedder=HashingEmbedder())
+    chatbot = Chatbot(processor, retrieval_mode="dense", semantic_index=semantic_index)
+    processor.upsert_entries([("What causes condition99?", "New.", "NIH")])
+
+    # A request between the snapshot swap and sync() cannot see the new row yet
+    assert chatbot.get_response("what causes condition99?")[0] != "what causes condition99?"
+
+    semantic_index.sync(processor.index.df['question'])
+
+    assert chatbot.get_response("what causes condition99?")[0] == "what causes condition99?"
@@ -0,0 +1,106 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from Chatbot.chatbot_function import Chatbot, CorpusIndex
+from Chatbot.semantic_index import SemanticIndex
+
+
+class StubEmbedder:
+    """Looks texts up in a fixed table instead of running a model."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def encode(self, texts):
+        return np.array([self.vectors[text] for text in texts], dtype=np.float32)
+
+
+def random_unit_vectors(n, dim=16, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def corpus():
+    vectors = random_unit_vectors(200)
+    questions = [f"question {i}" for i in range(len(vectors))]
+    return questions, StubEmbedder(dict(zip(questions, vectors))), vectors
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_exact_search_matches_brute_force(tmp_path, corpus, dtype):
+    questions, embedder, vectors = corpus
+    index = SemanticIndex.build(questions, index_dir=tmp_path, dtype=dtype, embedder=embedder)
+
+    ids, scores = index.exact_search_vector(vectors[7], k=5)
+
+    expected = np.argsort(-(vectors @ vectors[7]))[:5]
+    assert ids[0] == 7
+    assert list(ids) == list(expected)
+    assert scores[0] == pytest.approx(1.0, abs=0.02)
+    assert list(scores) == sorted(scores, reverse=True)
+
+
+def test_search_probing_every_list_equals_exact_search(tmp_path, corpus):
+    questions, embedder, vectors = corpus
+    index = SemanticIndex.build(questions, index_dir=tmp_path, n_lists=10, embedder=embedder)
+
+    for query in vectors[:20]:
+        ann_ids, _ = index.search_vector(query, k=5, nprobe=10)
+        exact_ids, _ = index.exact_search_vector(query, k=5)
+        assert list(ann_ids) == list(exact_ids)
+
+
+def test_search_embeds_query_and_finds_itself(tmp_path, corpus):
+    questions, embedder, _ = corpus
+    index = SemanticIndex.build(questions, index_dir=tmp_path, embedder=embedder)
+
+    ids, _ = index.search("question 42", k=1, nprobe=4)
+
+    assert list(ids) == [42]
+
+
+def test_load_rejects_index_built_for_other_questions(tmp_path, corpus):
+    questions, embedder, _ = corpus
+    SemanticIndex.build(questions, index_dir=tmp_path, embedder=embedder)
+
+    with pytest.raises(ValueError):
+        SemanticIndex.load(tmp_path, embedder=embedder, questions=list(reversed(questions)))
+
+
+def test_sync_covers_questions_added_after_build(tmp_path, corpus):
+    questions, embedder, vectors = corpus
+    SemanticIndex.build(questions, index_dir=tmp_path, embedder=embedder)
+    new_vector = -vectors[0]
+    embedder.vectors["new question"] = new_vector
+
+    index = SemanticIndex.load(tmp_path, embedder=embedder, questions=questions + ["new question"])
+    assert index.sync(questions + ["new question"]) == 1
+    assert index.sync(questions + ["new question"]) == 0
+
+    ids, _ = index.search_vector(new_vector, k=3)
+    exact_ids, _ = index.exact_search_vector(new_vector, k=3)
+    assert ids[0] == exact_ids[0] == 200
+
+
+def test_dense_mode_applies_its_own_threshold(tmp_path):
+    df = pd.DataFrame({"question": ["what is diabetes?", "what is asthma?"],
+                       "answer": ["a", "b"], "source": "NIH"})
+    query = np.array([0.8, 0.6], dtype=np.float32)
+    embedder = StubEmbedder({"what is diabetes?": np.array([1.0, 0.0], dtype=np.float32),
+                             "what is asthma?": np.array([0.0, 1.0], dtype=np.float32),
+                             "what is gout?": query})
+    index = SemanticIndex.build(df['question'], index_dir=tmp_path, embedder=embedder)
+    processor = SimpleNamespace(index=CorpusIndex.fit(df))
+
+    # Cosine 0.8 passes the TF-IDF cut-off but not the dense one
+    strict = Chatbot(processor, retrieval_mode="dense", semantic_index=index,
+                     similarity_threshold=0.5, dense_similarity_threshold=0.85)
+    loose = Chatbot(processor, retrieval_mode="dense", semantic_index=index,
+                    similarity_threshold=0.9, dense_similarity_threshold=0.75)
+
+    assert strict.get_response("what is gout?")[0] == "UNKNOWN"
+    assert loose.get_response("what is gout?")[0] == "what is diabetes?"
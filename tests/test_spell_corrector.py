@@ -0,0 +1,127 @@
+import zlib
+from collections import Counter
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.metrics.pairwise import cosine_similarity
+
+from Chatbot import chatbot_function
+from Chatbot.chatbot_function import Chatbot, CorpusIndex, SpellCorrector
+from Chatbot.semantic_index import SemanticIndex
+
+
+@pytest.fixture
+def corrector():
+    return SpellCorrector(Counter({
+        "diabetes": 10, "diabetic": 2, "hypertension": 5, "asthma": 4,
+        "lumps": 3, "symptoms": 8, "what": 50,
+    }))
+
+
+@pytest.mark.parametrize("a, b, expected", [
+    ("diabetes", "diabetes", 0),
+    ("hte", "the", 1),
+    ("asthma", "atshma", 1),
+    ("diabetis", "diabetes", 1),
+    ("hypertention", "hypertension", 1),
+    ("symtpmos", "symptoms", 2),
+])
+def test_distance_counts_transpositions_as_one_edit(a, b, expected):
+    assert SpellCorrector._distance(a, b, 2) == expected
+
+
+def test_distance_stops_past_max_distance():
+    assert SpellCorrector._distance("lupus", "hypertension", 2) == 3
+    assert SpellCorrector._distance("abcdef", "uvwxyz", 2) == 3
+
+
+def test_correct_word_fixes_misspelt_terms(corrector):
+    assert corrector.correct_word("diabetis") == "diabetes"
+    assert corrector.correct_word("hypertention") == "hypertension"
+    assert corrector.correct_word("astma") == "asthma"
+
+
+def test_correct_word_prefers_higher_count_on_ties():
+    corrector = SpellCorrector(Counter({"ulcers": 2, "ulcera": 9}))
+    # "ulcerx" is one substitution away from both terms
+    assert corrector.correct_word("ulcerx") == "ulcera"
+
+
+def test_short_words_allow_only_one_edit(corrector):
+    # "lupus" is two edits from "lumps"; too far for a five-letter word
+    assert corrector.correct_word("lupus") == "lupus"
+
+
+def test_correct_leaves_known_short_and_numeric_words(corrector):
+    assert corrector.correct("what are diabetis symptoms in 2024") == \
+        "what are diabetes symptoms in 2024"
+
+
+def make_chatbot(questions):
+    df = pd.DataFrame({
+        "question": questions,
+        "answer": [f"answer {i}" for i in range(len(questions))],
+        "source": "NIH",
+    })
+    return Chatbot(SimpleNamespace(index=CorpusIndex.fit(df)))
+
+
+def test_chatbot_matches_misspelt_query():
+    chatbot = make_chatbot(["what is diabetes?", "what is hypertension?"])
+
+    assert chatbot.get_response("What is diabetis?")[0] == "what is diabetes?"
+
+
+def test_chatbot_keeps_original_query_when_correction_scores_lower():
+    chatbot = make_chatbot(["what is lupus erythematosus?", "what are lumpus?"])
+    chatbot.data_processor.index.spell_corrector = SpellCorrector(Counter({"lumpus": 5}))
+
+    # Correcting "lupus" to "lumpus" would match the wrong question
+    assert chatbot.get_response("lupus erythematosus")[0] == "what is lupus erythematosus?"
+
+
+class CountingEmbedder:
+    """Bag-of-words hashing embedder that counts how often the model would run."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts):
+        self.calls += 1
+        vectors = np.zeros((len(texts), 64), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.split():
+                vectors[i, zlib.crc32(word.encode()) % 64] += 1
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+
+
+@pytest.mark.parametrize("mode", ["dense", "hybrid"])
+def test_misspelt_query_embeds_once(tmp_path, mode):
+    chatbot = make_chatbot(["what is diabetes?", "what is hypertension?"])
+    embedder = CountingEmbedder()
+    chatbot.semantic_index = SemanticIndex.build(
+        chatbot.data_processor.index.df['question'], index_dir=tmp_path, embedder=embedder
+    )
+    chatbot.retrieval_mode = mode
+    # The hashing stub scores the typo'd query at 2/3
+    chatbot.dense_similarity_threshold = 0.5
+    embedder.calls = 0
+
+    assert chatbot.get_response("what is diabetis?")[0] == "what is diabetes?"
+    assert embedder.calls == 1
+
+
+def test_misspelt_query_scans_tfidf_once(monkeypatch):
+    chatbot = make_chatbot(["what is diabetes?", "what is hypertension?"])
+    calls = []
+
+    def counting_similarity(*args):
+        calls.append(args)
+        return cosine_similarity(*args)
+
+    monkeypatch.setattr(chatbot_function, "cosine_similarity", counting_similarity)
+
+    assert chatbot.get_response("what is diabetis?")[0] == "what is diabetes?"
+    assert len(calls) == 1